@@ -1,82 +1,193 @@
 
+import functools
+import itertools
+import os
+
 import pandas as pd
 import numpy as np
-import seaborn as sns
+import matplotlib
+
+# Batch runs that only save the figure skip the GUI backend entirely.
+if os.environ.get('PLOT_OUTPUT'):
+    matplotlib.use('Agg')
+
+import matplotlib.patches as mpatches
 import matplotlib.pyplot as plt
 
 def read_export_import_data(filename):
     """
     Read merchandise data from a CSV file and preprocess it.
 
+    The preprocessed data is cached as '<filename>.v1.parquet' when pyarrow
+    is available and reused while it is newer than the CSV. Within a process,
+    repeated calls for an unchanged file return the same DataFrame, so
+    callers must copy it before modifying it.
+
     Parameters:
     filename (str): The path to the CSV file containing merchandise data.
 
     Returns:
     pd.DataFrame: Preprocessed merchandise data.
     """
-    merchandise_data = pd.read_csv(filename).iloc[:-10]
-    merchandise_data.drop(columns=['Country Code', 'Series Code'], 
-                          inplace=True)
-    merchandise_data.columns = [col.split(' ')[0] 
-                                for col in merchandise_data.columns]
+    return _load_export_import_data(filename, os.path.getmtime(filename))
+
+@functools.lru_cache(maxsize=4)
+def _load_export_import_data(filename, mtime):
+    """
+    Load and preprocess merchandise data; mtime only keys the cache.
+    """
+    years = [str(year) for year in range(2010, 2016)]
+    year_columns = {f'{year} [YR{year}]': year for year in years}
+
+    # A Parquet copy written next to the CSV skips the text parse on reruns;
+    # it is ignored once the CSV is newer than it. Bump the version tag
+    # whenever the columns or dtypes produced below change. An unreadable
+    # cache falls back to parsing the CSV.
+    cache_path = filename + '.v1.parquet'
+    if (os.path.exists(cache_path)
+            and os.path.getmtime(cache_path) >= os.path.getmtime(filename)):
+        try:
+            return pd.read_parquet(cache_path,
+                                   columns=['Country', 'Series', *years])
+        except (ImportError, OSError, ValueError):
+            pass
+
+    # The World Bank export ends its data block at the first row with an
+    # empty country name; everything after it is a free-text footer.
+    with open(filename) as data_file:
+        data_rows = sum(1 for _ in itertools.takewhile(
+            lambda line: not line.startswith(','), data_file)) - 1
+
+    # Country and Series are read as categoricals, so filters and the value
+    # cube already work on integer codes; Arrow-backed strings
+    # (dtype_backend='pyarrow') would add nothing on top of that.
+    merchandise_data = pd.read_csv(
+        filename, nrows=data_rows, engine='c',
+        usecols=['Country Name', 'Series Name', *year_columns],
+        dtype={'Country Name': 'category', 'Series Name': 'category',
+               **{col: 'float32' for col in year_columns}},
+        na_values=['..'])
+    merchandise_data.rename(columns={'Country Name': 'Country',
+                                     'Series Name': 'Series',
+                                     **year_columns}, inplace=True)
+
+    try:
+        merchandise_data.to_parquet(cache_path, engine='pyarrow',
+                                    compression='snappy', index=False)
+    except (ImportError, OSError):
+        pass
     return merchandise_data
 
-background_color = 'plum'
+def build_value_cube(data):
+    """
+    Arrange merchandise values into a dense Series x Country x Year array.
 
-sns.set(style="whitegrid", palette="pastel", context='talk')
+    Rows missing a Series or Country label cannot be looked up and are left
+    out; a (Series, Country) pair that appears twice raises ValueError.
 
-plt.rcParams.update({
-    'font.size': 20,
-    'axes.titleweight': 'bold',
-    'font.family': 'sans-serif',
-    'axes.labelweight': 'bold',
-    'figure.facecolor': background_color,
-    'axes.facecolor': background_color,
-    'savefig.facecolor': background_color
-})
+    Parameters:
+    data (pd.DataFrame): Merchandise data from read_export_import_data.
 
-plt.figure(figsize=(45, 45))
+    Returns:
+    dict: The float32 value array under 'values', plus the label-to-position
+    lookups for its axes under 'series', 'countries' and 'years'.
+    """
+    series = data['Series'].cat.categories
+    countries = data['Country'].cat.categories
+    years = data.columns[data.columns.str.isdigit()].tolist()
+
+    # Code -1 marks a missing label and would otherwise index the last slot.
+    series_codes = data['Series'].cat.codes.to_numpy()
+    country_codes = data['Country'].cat.codes.to_numpy()
+    labelled = (series_codes >= 0) & (country_codes >= 0)
+    series_codes = series_codes[labelled]
+    country_codes = country_codes[labelled]
+
+    pair_codes = series_codes.astype(np.intp) * len(countries) + country_codes
+    if len(np.unique(pair_codes)) != len(pair_codes):
+        raise ValueError('Each (Series, Country) pair must appear only once.')
+
+    values = np.full((len(series), len(countries), len(years)), np.nan,
+                     dtype=np.float32)
+    values[series_codes, country_codes] = data[years].to_numpy(
+        dtype=np.float32, na_value=np.nan, copy=False)[labelled]
+
+    return {'values': values,
+            'series': {name: i for i, name in enumerate(series)},
+            'countries': {name: i for i, name in enumerate(countries)},
+            'years': {year: i for i, year in enumerate(years)}}
+
+def select_values(cube, indicator, countries, years):
+    """
+    Gather the values of one indicator for selected countries and years.
+
+    Parameters:
+    cube (dict): Merchandise value cube from build_value_cube.
+    indicator (str): The merchandise indicator to select.
+    countries (list): List of countries, in the order to return them.
+    years (list): List of years, in the order to return them.
+
+    Returns:
+    np.ndarray: float32 array of shape (len(countries), len(years)).
+    """
+    country_positions = np.array([cube['countries'][country]
+                                  for country in countries], dtype=np.intp)
+    year_positions = np.array([cube['years'][year] for year in years],
+                              dtype=np.intp)
+    return cube['values'][cube['series'][indicator],
+                          country_positions[:, None], year_positions]
 
-fig, axs = plt.subplots(2, 2, figsize=(40, 20))
-plt.subplots_adjust(left=0.05, bottom=0.1, right=0.6, top=0.9, wspace=0.3,
-                    hspace=0.4)
+background_color = 'plum'
 
-def line_plot_creation(ax, data, countries, indicator, years):
+def line_plot_creation(ax, cube, countries, indicator, years):
     """
     Create line plots showing merchandise values for specific indicators 
     across different years for selected countries.
 
     Parameters:
     ax (matplotlib.axes.Axes): The Axes object for plotting.
-    data (pd.DataFrame): Merchandise data.
+    cube (dict): Merchandise value cube from build_value_cube.
     countries (list): List of countries for plotting.
     indicator (str): The merchandise indicator for visualization.
     years (list): List of years for which data will be plotted.
     """
     colors = ['red', 'dodgerblue', 'lawngreen', 'k']
-    for i, year in enumerate(years):
-        values = data.loc[(data['Series'] == indicator) 
-                          & (data['Country'].isin(countries)),
-                          year].values.tolist()
-        values = pd.to_numeric(values, errors='coerce') / 1e1
-        ax.plot(countries, values, marker='D', label=f'{year}',
-                color=colors[i])
-
-    ax.set_title(f'{indicator} (American Countries)', pad=15, fontsize=30)
-    sns.set_style("dark")
+    # A 2-D y draws one line per year (column) in a single plot call.
+    lines = ax.plot(countries,
+                    select_values(cube, indicator, countries, years) / 1e1,
+                    marker='D', label=years)
+    for line, color in zip(lines, colors):
+        line.set_color(color)
+
+    ax.set_title(f'{indicator} (American Countries)', pad=15, fontsize=27)
     ax.set_xlabel('Country', fontsize=20)
     ax.set_ylabel('Value (in 10^10)', fontsize=20)
     ax.legend()
     ax.grid(True)
 
-def horizontal_bar_plot_creation(ax, data, countries, indicator, years):
+def format_value_labels(values_billions):
+    """
+    Format values in billions as '1.2B', or as '345.6M' below one billion.
+
+    Parameters:
+    values_billions (np.ndarray): Values expressed in billions.
+
+    Returns:
+    list: One label string per value.
+    """
+    return np.where(values_billions >= 1,
+                    np.char.add(np.char.mod('%.1f', values_billions), 'B'),
+                    np.char.add(np.char.mod('%.1f', values_billions * 1000),
+                                'M')).tolist()
+
+def horizontal_bar_plot_creation(ax, cube, countries, indicator, years):
     """
     Create horizontal bar plots illustrating merchandise values for
     specific indicators across different years for selected countries.
 
     Parameters:
     ax (matplotlib.axes.Axes): The Axes object for plotting.
-    data (pd.DataFrame): Merchandise data.
+    cube (dict): Merchandise value cube from build_value_cube.
     countries (list): List of countries for plotting.
     indicator (str): The merchandise indicator for visualization.
     years (list): List of years for which data will be plotted.
@@ -85,36 +196,34 @@ def horizontal_bar_plot_creation(ax, data, countries, indicator, years):
     bar_positions = np.arange(len(countries))
 
     colormap = plt.cm.viridis
+    year_colors = colormap(np.linspace(0, 1, len(years), endpoint=False))
+
+    # One barh call draws every year: bars are laid out year by year, each
+    # year offset by one bar height from the country's base position.
+    values_billions = (select_values(cube, indicator, countries, years)
+                       * np.float32(1e-9)).ravel('F')
+    positions = (bar_positions[:, None]
+                 + np.arange(len(years)) * bar_height).ravel('F')
 
-    for i, year in enumerate(years):
-        values = data.loc[(data['Series'] == indicator) 
-                          & (data['Country'].isin(countries)),
-                          year].values.tolist()
-        values = pd.to_numeric(values, errors='coerce')
-        values_billions = [val / 1_000_000_000 for val in values]
-
-        bars = ax.barh(bar_positions + i * (bar_height), values_billions, 
-                       height=bar_height, label=f'{year}', 
-                       color=colormap(i / len(years)), edgecolor='k')
-
-        for bar, value in zip(bars, values_billions):
-            formatted_value = f'{value:.1f}B' if value >= 1 else f'{value * 1000:.1f}M'
-            ax.text(bar.get_width(), bar.get_y() + bar.get_height() / 2, 
-                    formatted_value, ha='left', va='center', color='k',
-                    fontsize=20)
-
-    ax.set_title(f'{indicator} (Asian Countries)', pad=27, fontsize=30)
-    sns.set_style("dark")
+    bars = ax.barh(positions, values_billions, height=bar_height,
+                   color=np.repeat(year_colors, len(countries), axis=0),
+                   edgecolor='k')
+
+    ax.bar_label(bars, labels=format_value_labels(values_billions),
+                 padding=2, color='k', fontsize=20)
+
+    ax.set_title(f'{indicator} (Asian Countries)', pad=27, fontsize=27)
     ax.set_xlabel('Value (in Billions)', fontsize=20)
     ax.set_ylabel('Country', fontsize=20)
     ax.set_yticks(bar_positions + ((len(years) - 1) * (bar_height)) / 2)
     ax.set_yticklabels(countries)
-    ax.legend()
+    ax.legend([mpatches.Patch(facecolor=color, edgecolor='k')
+               for color in year_colors], years)
     ax.grid()
     ax.spines['top'].set_visible(False)
     ax.spines['right'].set_visible(False)
 
-def create_merchandise_pie_chart(ax, data, countries, indicator, year,
+def create_merchandise_pie_chart(ax, cube, countries, indicator, year,
                                  chart_type):
     """
     Create pie charts displaying the distribution of 
@@ -123,107 +232,124 @@ def create_merchandise_pie_chart(ax, data, countries, indicator, year,
 
     Parameters:
     ax (matplotlib.axes.Axes): The Axes object for plotting.
-    data (pd.DataFrame): Merchandise data.
+    cube (dict): Merchandise value cube from build_value_cube.
     countries (list): List of countries for plotting.
     indicator (str): The merchandise indicator for visualization.
     year (str): The year for which data will be visualized.
     chart_type (str): Type of merchandise chart ('exports' or 'imports').
     """
-    values = data.loc[(data['Series'] == indicator)
-                      & (data['Country'].isin(countries)), 
-                      year].values.tolist()
-    values = pd.to_numeric(values, errors='coerce')
+    values = select_values(cube, indicator, countries, [year])[:, 0]
 
-    explode = [0.1] * len(countries)
+    explode = np.full(len(countries), 0.1, dtype=np.float32)
 
     colormap = plt.cm.Set3 if chart_type == 'exports' else plt.cm.prism
 
     ax.pie(values, labels=countries, explode=explode, autopct='%1.1f%%',
-           shadow=True, startangle=140,
+           startangle=140,
+           wedgeprops={'width': 0.6, 'edgecolor': 'white'},
            colors=colormap(np.linspace(0, 1, len(countries))))
 
     chart_title = 'Exports to economies in the Arab World' if chart_type == 'exports' else 'Imports from economies in the Arab World'
 
-    ax.set_title(f'{chart_title} in {year}', pad=20, fontsize=30)
-    centre_circle = plt.Circle((0, 0), 0.40, fc='white')
-    ax.add_artist(centre_circle)
+    ax.set_title(f'{chart_title} in {year}', pad=20, fontsize=27)
     ax.text(0, 0, f'{chart_type.capitalize()}', ha='center', va='center', 
             fontsize=25, color='black', weight='bold')
     ax.axis('equal')
 
-filename = "MerchandiseData.csv"
-
-merchandise_data = read_export_import_data(filename)
-
-arab_countries = ['Saudi Arabia', 'Bahrain', 'Iraq',
-                  'Qatar', 'Libya', 'Kuwait']
-european_countries = ['France', 'Germany', 'Italy', 'Poland', 'Spain']
-asian_countries = ['China', 'India', 'Japan', 'Malaysia', 'Singapore']
-american_countries = ['Colombia', 'Brazil', 'Canada',
-                      'Chile', 'Argentina', 'Mexico']
-
-year_list = ['2010', '2011', '2012', '2013']
-indicators_list = ['Merchandise exports (current US$)',
-                   'Merchandise exports to economies in the Arab World (% of total merchandise exports)',
-                   'Merchandise imports (current US$)',
-                   'Merchandise imports from economies in the Arab World (% of total merchandise imports)']
-
-line_plot_creation(axs[0, 0], merchandise_data, american_countries, 
-                   'Merchandise exports (current US$)', year_list)
-horizontal_bar_plot_creation(axs[0, 1], merchandise_data, asian_countries,
-                             'Merchandise imports (current US$)', year_list)
-create_merchandise_pie_chart(axs[1, 0], 
-                             merchandise_data, arab_countries,
-                             'Merchandise exports to economies in the Arab World (% of total merchandise exports)', '2015', 'exports')
-create_merchandise_pie_chart(axs[1, 1], 
-                             merchandise_data, arab_countries,
-                             'Merchandise imports from economies in the Arab World (% of total merchandise imports)', '2015', 'imports')
-
-plt.suptitle('Growth of Merchandise Trade in the Regions 2010-2015',
-             fontsize=40, weight='bold')
-
-details_params = {
-    'facecolor': '#add8e6',
-    'alpha': 0.7,
-    'edgecolor': 'black',
-    'boxstyle': 'round,pad=1'
-}
-
 description_text = """
 Objective of the Plots:
 
-The Merchandise value of goods exported by American nations grew gradually, rising from 70 billion in 2010 to 458 billion in 2013. Canada is a major exporter of goods, with 387 billion in 2010 and 458 billion in 2013.
+The Merchandise value of goods exported by American nations grew gradually, with Colombia rising from 40 billion in 2010 to 59 billion in 2013. Canada is a major exporter of goods, with 387 billion in 2010 and 458 billion in 2013.
 
-Asian countries are gradually increasing their imports of goods across all regions, but China is the region's leading importer in 2010, the value of its imports was $1369 billion, but in 2013, it jumped to $1950 billion.
+Asian countries are gradually increasing their imports of goods across all regions, but China is the region's leading importer in 2010, the value of its imports was $1396 billion, but in 2013, it jumped to $1950 billion.
 
 In 2015, the percentage of goods exported and imported by the Arab countries' economies had significant consequences.
-Saudi Arabia exports 67.1% of its commodities, but only imports 33.4% of them. In terms of economics, Kuwait is the second-largest Arab exporter, accounting for 10.4% of global goods.
+Bahrain accounts for 67.1% of these exports, but only 33.4% of the imports. In terms of economics, Saudi Arabia is the second-largest Arab exporter, accounting for 10.4% of the exports.
 
-In the Arab world's economy in 2015, 50.7% of imports were sourced from Qatar, Libya, and Iraq.
+In the Arab world's economy in 2015, 50.7% of imports were sourced from Libya, Kuwait, and Qatar.
 
 Data Source: World Bank Data
 """
 
-details = "Name : Susairaj Anthony\nStudent ID : 22071718"
-
-font_props = {'fontsize': 40, 'weight': 'bold', 'family': 'sans-serif'}
-
-plt.figtext(0.70, 0.1, details, ha='left', va='center', 
-            fontdict=font_props, bbox=details_params)
-
-description_font_props = {'fontsize': 35, 'family': 'sans-serif',
-                          'weight': 'bold'}
-
-plt.figtext(0.60, 0.3, description_text, ha='left', va='bottom',
-            fontdict=description_font_props, wrap=True)
-
-plt.tight_layout(pad=2, rect=[0, 0, 0.6, 1])
-plt.subplots_adjust(top=0.90)
-
-#plt.savefig("22071718.png", dpi=300, bbox_inches='tight')
-
-plt.show()
-
-
-
-
+if __name__ == '__main__':
+    plt.style.use('seaborn-v0_8-whitegrid')
+
+    plt.rcParams.update({
+        'font.size': 20,
+        'axes.titleweight': 'bold',
+        'font.family': 'sans-serif',
+        'axes.labelweight': 'bold',
+        'figure.facecolor': background_color,
+        'axes.facecolor': background_color,
+        'savefig.facecolor': background_color
+    })
+
+    fig, axs = plt.subplots(2, 2, figsize=(40, 20))
+    plt.subplots_adjust(left=0.05, bottom=0.1, right=0.6, top=0.9, wspace=0.3,
+                        hspace=0.4)
+
+    filename = "MerchandiseData.csv"
+
+    merchandise_data = read_export_import_data(filename)
+    merchandise_cube = build_value_cube(merchandise_data)
+
+    arab_countries = ['Saudi Arabia', 'Bahrain', 'Iraq',
+                      'Qatar', 'Libya', 'Kuwait']
+    european_countries = ['France', 'Germany', 'Italy', 'Poland', 'Spain']
+    asian_countries = ['China', 'India', 'Japan', 'Malaysia', 'Singapore']
+    american_countries = ['Colombia', 'Brazil', 'Canada',
+                          'Chile', 'Argentina', 'Mexico']
+
+    year_list = ['2010', '2011', '2012', '2013']
+    indicators_list = ['Merchandise exports (current US$)',
+                       'Merchandise exports to economies in the Arab World (% of total merchandise exports)',
+                       'Merchandise imports (current US$)',
+                       'Merchandise imports from economies in the Arab World (% of total merchandise imports)']
+
+    line_plot_creation(axs[0, 0], merchandise_cube, american_countries, 
+                       'Merchandise exports (current US$)', year_list)
+    horizontal_bar_plot_creation(axs[0, 1], merchandise_cube, asian_countries,
+                                 'Merchandise imports (current US$)', year_list)
+    create_merchandise_pie_chart(axs[1, 0], 
+                                 merchandise_cube, arab_countries,
+                                 'Merchandise exports to economies in the Arab World (% of total merchandise exports)', '2015', 'exports')
+    create_merchandise_pie_chart(axs[1, 1], 
+                                 merchandise_cube, arab_countries,
+                                 'Merchandise imports from economies in the Arab World (% of total merchandise imports)', '2015', 'imports')
+
+    plt.suptitle('Growth of Merchandise Trade in the Regions 2010-2015',
+                 fontsize=40, weight='bold')
+
+    details_params = {
+        'facecolor': '#add8e6',
+        'alpha': 0.7,
+        'edgecolor': 'black',
+        'boxstyle': 'round,pad=1'
+    }
+
+    details = "Name : Susairaj Anthony\nStudent ID : 22071718"
+
+    font_props = {'fontsize': 40, 'weight': 'bold', 'family': 'sans-serif'}
+
+    plt.figtext(0.70, 0.08, details, ha='left', va='center', 
+                fontdict=font_props, bbox=details_params)
+
+    description_font_props = {'fontsize': 32, 'family': 'sans-serif',
+                              'weight': 'bold'}
+
+    # Anchor the caption at its top so extra wrapped lines grow downwards
+    # towards the details box rather than up into the title.
+    plt.figtext(0.60, 0.90, description_text, ha='left', va='top',
+                fontdict=description_font_props, wrap=True)
+
+    plt.tight_layout(pad=2, rect=[0, 0, 0.58, 1])
+    plt.subplots_adjust(top=0.88, wspace=0.45)
+
+    # PLOT_OUTPUT=22071718.pdf gives vector output with no rasterization;
+    # raster formats use PLOT_DPI (default 150).
+    output_path = os.environ.get('PLOT_OUTPUT')
+    if output_path:
+        plt.savefig(output_path, dpi=int(os.environ.get('PLOT_DPI', 150)),
+                    bbox_inches='tight')
+    else:
+        plt.show()